@@ -1,6 +1,9 @@
 """
 Class for image data
 """
+import functools
+import socket
+from email.utils import make_msgid
 from typing import NamedTuple
 
 
@@ -10,3 +13,28 @@ class Image(NamedTuple):
     content_id: str
     maintype: str = 'image'
     subtype: str = 'png'
+
+
+def make_content_id(idstring: str) -> str:
+    """
+    Return a unique content ID for an image attachment.
+
+    :param str idstring: A string that helps identify the image, e.g. a station ID
+
+    :returns: The content ID, including its angle brackets
+    :rtype: str
+    """
+    # make_msgid looks up the host's fully qualified domain name on every call unless it's given one,
+    # and that lookup can block on DNS. The name doesn't change while Pytide runs, so look it up once.
+    return make_msgid(idstring, domain=__get_domain())
+
+
+@functools.cache
+def __get_domain() -> str:
+    """
+    Return the host's fully qualified domain name, looking it up only once.
+
+    :returns: The domain name used in content IDs
+    :rtype: str
+    """
+    return socket.getfqdn()
@@ -0,0 +1,14 @@
+"""
+Class for email server settings
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True, slots=True)
+class SmtpSettings:
+    """The settings for the email server that sends the report"""
+    sender: str
+    host: str
+    port: int
+    user: str
+    password: str = field(repr=False)
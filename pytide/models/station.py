@@ -1,71 +1,132 @@
 """
 Class for station data
 """
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from email.utils import make_msgid
-from typing import Any, ClassVar
+from threading import Lock
+from typing import Any, ClassVar, Optional
 
-from models.image import Image
+from models.image import Image, make_content_id
+from models.tide_event import TideEvent
 from repositories import maps, tides
 
+# NOAA marks each high / low tide prediction with a single letter. Anything other than a high tide
+# is reported as a low tide.
+_TIDE_TYPES = {'H': 'High', 'L': 'Low'}
 
-@dataclass()
+
+@dataclass(slots=True)
 class Station:
     """
     A class that holds important NOAA tide station information like a station ID, a name, and tide
-    events for the station
+    events for the station. Creating a station is cheap; its data is retrieved by calling fetch().
     """
-    _metadata: ClassVar[list[dict[str, Any]]] = tides.get_all_station_metadata()
+    _metadata: ClassVar[Optional[dict[str, dict[str, Any]]]] = None
+    _metadata_lock: ClassVar[Lock] = Lock()
+    _maps: ClassVar[dict[tuple[str, str], Future[Image]]] = {}
+    _maps_lock: ClassVar[Lock] = Lock()
     api_key: ClassVar[str]
 
     id_: str
     name: str = field(default='')
     latitude: str = field(init=False)
     longitude: str = field(init=False)
-    tide_events: list[str] = field(default_factory=list, init=False)
+    tide_events: list[TideEvent] = field(default_factory=list, init=False)
     image: Image = field(init=False, repr=False)
 
-    def __post_init__(self):
+    def fetch(self, include_map: bool = True) -> None:
+        """
+        Retrieve the station's metadata, tide predictions, and map image.
+
+        :param bool include_map: Whether to retrieve the map image, which is only needed for email
+        """
         self.__add_metadata()
-        self.__add_predictions()
-        self.__add_map()
+
+        if not include_map:
+            self.__add_predictions()
+            return
+
+        # The predictions and the map come from different hosts and don't depend on each other, so
+        # fetch the predictions in the background while the map is retrieved.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            predictions = executor.submit(self.__add_predictions)
+            self.__add_map()
+            predictions.result()
 
     def __str__(self) -> str:
-        output = f'ID# {self.id_}: {self.name} ({self.latitude}, {self.longitude})'
+        header = f'ID# {self.id_}: {self.name} ({self.latitude}, {self.longitude})'
+
+        return '\n\t'.join([header, *map(str, self.tide_events)])
 
-        for tide in self.tide_events:
-            output += f'\n\t{tide}'
+    @classmethod
+    def is_known(cls, id_: str) -> bool:
+        """
+        Return whether id_ is a known NOAA tide prediction station.
 
-        return output
+        :param str id_: The station ID to check
+
+        :returns: True if NOAA publishes tide predictions for the station
+        :rtype: bool
+        """
+        return id_ in cls.__get_metadata()
+
+    @classmethod
+    def __get_metadata(cls) -> dict[str, dict[str, Any]]:
+        """Return metadata for all stations, retrieving it on first use."""
+        # Stations are built on several threads, but the station list should only be retrieved once.
+        with cls._metadata_lock:
+            if cls._metadata is None:
+                cls._metadata = tides.get_all_station_metadata()
+
+        return cls._metadata
 
     def __add_metadata(self) -> None:
         """Add station name, latitude, and longitude."""
-        for station in Station._metadata:
-            if self.id_ != station['id']:
-                continue
+        station = Station.__get_metadata().get(self.id_)
 
-            self.name = station['name']
+        if not station:
+            return
 
-            # Six digits of decimal precision is plenty.
-            self.latitude = str(round(station['lat'], 6))
-            self.longitude = str(round(station['lng'], 6))
-            break
+        # Prefer the name from the configuration file and fall back to NOAA's name for the station.
+        self.name = self.name or station['name']
+
+        # Six digits of decimal precision is plenty. A fixed width also keeps map requests, and so
+        # their cache entries, identical from run to run.
+        self.latitude = f"{station['lat']:.6f}"
+        self.longitude = f"{station['lng']:.6f}"
 
     def __add_predictions(self) -> None:
         """Add tide predictions for the station."""
         predictionary = tides.get_predictions_for_station(self.id_)
 
-        for event in predictionary['predictions']:
-            date_time = event['t']  # 'YYYY-MM-DD HH:MM'
-            water_change = event['v']  # '1.234'
-            tide_type = 'High' if event['type'] == 'H' else 'Low'  # 'L' or 'H'
-            tide_string = f'{date_time} {tide_type} ({water_change}\')'
+        if not predictionary:
+            return
 
-            self.tide_events.append(tide_string)
+        # Each event has a date and time 't' ('YYYY-MM-DD HH:MM'), a water level 'v' ('1.234'), and a
+        # tide type ('H' or 'L').
+        self.tide_events = [TideEvent(event['t'], _TIDE_TYPES.get(event['type'], 'Low'), event['v'])
+                            for event in predictionary['predictions']]
 
     def __add_map(self) -> None:
         """Add a static map image for the station."""
-        image = maps.get_map_image(self.latitude, self.longitude, Station.api_key)
-        content_id = make_msgid(self.id_)
-
-        self.image = Image(image, content_id)
+        coordinates = (self.latitude, self.longitude)
+
+        # Stations that share coordinates share a map, so the first station to ask for one retrieves
+        # it while the others wait for the result. They all get the same image and content ID, so the
+        # email only carries one copy of the map.
+        with Station._maps_lock:
+            future = Station._maps.get(coordinates)
+            is_owner = future is None
+
+            if is_owner:
+                future = Station._maps[coordinates] = Future()
+
+        if is_owner:
+            try:
+                image = maps.get_map_image(self.latitude, self.longitude, Station.api_key)
+                future.set_result(Image(image, make_content_id('map')))
+            except BaseException as error:
+                future.set_exception(error)
+                raise
+
+        self.image = future.result()
@@ -0,0 +1,14 @@
+"""
+Class for tide event data
+"""
+from typing import NamedTuple
+
+
+class TideEvent(NamedTuple):
+    """A predicted high or low tide for a station"""
+    date_time: str
+    tide_type: str
+    level: str
+
+    def __str__(self) -> str:
+        return f'{self.date_time} {self.tide_type} ({self.level}\')'
@@ -2,14 +2,23 @@
 Pytide: An application for retrieving tide predictions from the National Oceanic and Atmospheric
 Administration (NOAA) and emailing them to a list of recipients.
 """
+import logging
 import os
-from configparser import ConfigParser
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser, NoOptionError, NoSectionError
 from email.message import EmailMessage
+from typing import Optional
 
 import click
+from models.smtp_settings import SmtpSettings
 from models.station import Station
 from services import email
 
+_LOGGER = logging.getLogger(__name__)
+
+# The configuration file used when none is given on the command line.
+_DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.ini')
+
 
 @click.command()
 @click.option('--config-file', show_envvar=True, help='Use a custom configuration file')
@@ -28,32 +37,107 @@ def main(config_file: str, maps_api_key: str, send_email: bool, save_email: bool
     :param bool save_email: Flag for saving email message locally
     :param bool save_html: Flag for saving HTML email message body locally
     """
-    source_dir = os.path.dirname(os.path.abspath(__file__))
+    # Problems with a single station, map, or cache file are reported as warnings and don't stop the
+    # report.
+    logging.basicConfig(format='%(levelname)s: %(message)s')
 
     # Set the user's config file path based on optional command line input.
-    if config_file:
-        config_path = os.path.abspath(config_file)
-    else:
-        config_path = os.path.join(source_dir, '..', 'config.ini')
+    config_path = os.path.abspath(config_file) if config_file else _DEFAULT_CONFIG_PATH
 
     # Allow the user to exclude station names in the config.
     config = ConfigParser(allow_no_value=True, empty_lines_in_values=False)
 
-    with open(config_path, mode='rt', encoding='utf-8') as file:
-        config.read_file(file)
+    # ConfigParser.read skips files it can't open, so treat an empty result as an error.
+    if not config.read(config_path, encoding='utf-8'):
+        raise SystemExit(f'Unable to read configuration file {config_path}')
 
     # Set the user configuration settings.
     Station.api_key = maps_api_key if maps_api_key else config.get('GOOGLE MAPS API', 'key')
-    stations: list[Station] = [Station(item[0], item[1]) for item in config.items('STATIONS')]
-    recipients: set[str] = {item[0] for item in config.items('RECIPIENTS')}
-    smtp_settings = dict(config.items('SMTP SERVER'))
+    recipients: set[str] = set(config['RECIPIENTS'])
+
+    # The email server settings are only needed to send the report, so don't require them otherwise.
+    smtp_settings: Optional[SmtpSettings] = __read_smtp_settings(config, config_path) if send_email else None
+
+    # Skip unknown station IDs before any requests are made for them.
+    stations: list[Station] = []
+
+    for station_id, station_name in config.items('STATIONS'):
+        if Station.is_known(station_id):
+            stations.append(Station(station_id, station_name))
+        else:
+            _LOGGER.warning('Skipping unknown tide prediction station ID %s', station_id)
+
+    # Map images are only used in the email, so skip them when the email won't be sent or saved.
+    needs_message = send_email or save_email or save_html
+
+    # Each station blocks on its own network requests, so fetch them concurrently. The default worker
+    # count is based on CPU count, which is too low for network-bound work, so size the pool
+    # explicitly while staying under the HTTP session's pool size.
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        fetched = list(executor.map(lambda station: __fetch_station(station, needs_message), stations))
+
+    # A station that couldn't be fetched is left out rather than costing everyone else their report.
+    stations = [station for station, is_fetched in zip(stations, fetched) if is_fetched]
+
+    if not needs_message:
+        return
 
     # Craft a single HTML message body for use in all messages.
-    message: EmailMessage = email.create_message(source_dir, stations, save_html, save_email)
+    message: EmailMessage = email.create_message(stations, save_html, save_email)
 
-    if send_email:
+    if smtp_settings:
         email.send_message(message, recipients, smtp_settings)
 
 
+def __read_smtp_settings(config: ConfigParser, config_path: str) -> SmtpSettings:
+    """
+    Return the email server settings from the configuration, exiting if any of them is missing.
+
+    :param ConfigParser config: The user's configuration
+    :param str config_path: The path of the configuration file, for error messages
+
+    :returns: The email server settings
+    :rtype: SmtpSettings
+    """
+    # Every setting is required. A setting without a value is read as None, so check for that too.
+    try:
+        values = {key: config.get('SMTP SERVER', key)
+                  for key in ('sender', 'host', 'port', 'user', 'password')}
+    except (NoOptionError, NoSectionError) as error:
+        raise SystemExit(f'Missing SMTP SERVER setting in {config_path} -> {error}') from error
+
+    missing = [key for key, value in values.items() if not value]
+
+    if missing:
+        raise SystemExit(f'Missing SMTP SERVER setting in {config_path} -> {", ".join(missing)}')
+
+    try:
+        port = int(values['port'])
+    except ValueError as error:
+        raise SystemExit(f'Invalid SMTP SERVER port in {config_path} -> {values["port"]}') from error
+
+    return SmtpSettings(values['sender'], values['host'], port, values['user'], values['password'])
+
+
+def __fetch_station(station: Station, include_map: bool) -> bool:
+    """
+    Retrieve the station's data, reporting any problem instead of raising it.
+
+    :param Station station: The station to retrieve data for
+    :param bool include_map: Whether to retrieve the map image
+
+    :returns: True if the station's data was retrieved
+    :rtype: bool
+    """
+    try:
+        station.fetch(include_map=include_map)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        _LOGGER.warning('Leaving station %s out of the report -> %s', station.id_, error)
+
+        return False
+
+    return True
+
+
 if __name__ == '__main__':
     main(auto_envvar_prefix='PYTIDE')
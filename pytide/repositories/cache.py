@@ -0,0 +1,131 @@
+"""
+Functions for caching API responses on disk
+"""
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Response headers that let a later request ask the server whether a cached response is still valid.
+_VALIDATOR_HEADERS = {'ETag': 'If-None-Match', 'Last-Modified': 'If-Modified-Since'}
+
+
+def get_cache_dir() -> str:
+    """
+    Return the directory used for Pytide's cached files.
+
+    :returns: The cache directory path
+    :rtype: str
+    """
+    # Follow the XDG base directory convention, falling back to ~/.cache when it isn't set.
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(cache_home, 'pytide')
+
+
+def read(name: str, max_age: Optional[float] = None) -> Optional[bytes]:
+    """
+    Return the cached contents for name if they exist and are younger than max_age.
+
+    :param str name: The name of the cached file
+    :param Optional[float] max_age: The maximum age of the cached file in seconds, or None for any age
+
+    :returns: The cached bytes, or None if there is no fresh cache entry
+    :rtype: Optional[bytes]
+    """
+    path = os.path.join(get_cache_dir(), name)
+
+    try:
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            return None
+
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def write(name: str, data: bytes, headers: Optional[dict[str, str]] = None) -> None:
+    """
+    Save data to the cache as name, along with any validators found in the response headers.
+
+    :param str name: The name of the cached file
+    :param bytes data: The bytes to cache
+    :param Optional[dict[str, str]] headers: The headers of the response that data came from, if the
+        cached file will be revalidated with conditional requests
+    """
+    __write_file(name, data)
+
+    if headers is not None:
+        validators = {key: headers[key] for key in _VALIDATOR_HEADERS if key in headers}
+        __write_file(f'{name}.validators', json.dumps(validators).encode())
+
+
+def touch(name: str) -> None:
+    """
+    Mark the cached file name as fresh, e.g. after the server confirms it hasn't changed.
+
+    :param str name: The name of the cached file
+    """
+    try:
+        os.utime(os.path.join(get_cache_dir(), name))
+    except OSError:
+        pass
+
+
+def get_conditional_headers(name: str) -> dict[str, str]:
+    """
+    Return request headers asking the server to skip the response body if name is still current.
+
+    :param str name: The name of the cached file
+
+    :returns: The conditional request headers, or an empty dict if nothing is cached
+    :rtype: dict[str, str]
+    """
+    # Without the cached body, a 304 response would leave us with nothing to use.
+    if not os.path.exists(os.path.join(get_cache_dir(), name)):
+        return {}
+
+    try:
+        validators = json.loads(read(f'{name}.validators') or b'{}')
+    except ValueError:
+        return {}
+
+    return {_VALIDATOR_HEADERS[key]: value for key, value in validators.items() if key in _VALIDATOR_HEADERS}
+
+
+def __write_file(name: str, data: bytes) -> None:
+    """
+    Atomically write data to the cache as name.
+
+    :param str name: The name of the cached file
+    :param bytes data: The bytes to write
+    """
+    path = os.path.join(get_cache_dir(), name)
+    directory, filename = os.path.split(path)
+    temporary_path = None
+
+    # A cache is only an optimization, so failing to write one should never stop a report. Writing to
+    # a uniquely named temporary file first means a crash, another thread, or a concurrent run never
+    # leaves a half-written cache file.
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+        file_descriptor, temporary_path = tempfile.mkstemp(prefix=f'{filename}.', suffix='.tmp', dir=directory)
+
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(data)
+
+        os.replace(temporary_path, path)
+    except OSError as error:
+        # Nothing is lost but a little time on the next run, so this isn't worth warning the user about.
+        _LOGGER.debug('Unable to write cache file %s -> %s', path, error)
+
+        if temporary_path:
+            with contextlib.suppress(OSError):
+                os.remove(temporary_path)
@@ -1,15 +1,26 @@
 """
 Function for retrieving static map images
 """
+import hashlib
+import logging
+import os
 from typing import Any, Union
 
-import requests
+from repositories import cache
+from repositories.session import SESSION, TIMEOUT
 from requests import RequestException
 
+_LOGGER = logging.getLogger(__name__)
+
+# Cached map images are refreshed after 30 days so map changes eventually show up and Pytide stays
+# within the caching terms of the Google Maps Platform.
+_MAP_MAX_AGE = 30 * 24 * 60 * 60
+
 
 def get_map_image(latitude: str, longitude: str, api_key: str) -> Union[bytes, Any]:
     """
-    Return a static map image for the given latitude and longitude.
+    Return a static map image for the given latitude and longitude, using the on-disk cache if the
+    image was retrieved within the last 30 days.
 
     :param str latitude: The latitude for the map image
     :param str longitude: The longitude for the map image
@@ -30,12 +41,23 @@ def get_map_image(latitude: str, longitude: str, api_key: str) -> Union[bytes, A
         'key': f'{api_key}'
     }
 
+    # A map image only depends on its parameters, so cache it under a hash of everything but the key.
+    map_key = '&'.join(f'{name}={value}' for name, value in parameters.items() if name != 'key')
+    cache_name = os.path.join('maps', f'{hashlib.blake2b(map_key.encode(), digest_size=16).hexdigest()}.png')
+
+    cached_image = cache.read(cache_name, _MAP_MAX_AGE)
+
+    if cached_image:
+        return cached_image
+
     try:
-        response = requests.get(api_url, parameters, stream=True, timeout=10)
+        response = SESSION.get(api_url, params=parameters, timeout=TIMEOUT)
         response.raise_for_status()
 
+        cache.write(cache_name, response.content)
+
         return response.content
     except RequestException as error:
-        print(f'Unable to retrieve map image for {latitude} and {longitude} -> {error}')
+        _LOGGER.warning('Unable to retrieve map image for %s and %s -> %s', latitude, longitude, error)
 
         return None
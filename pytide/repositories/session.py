@@ -0,0 +1,28 @@
+"""
+Shared HTTP session for the API repositories
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# A single session lets urllib3 keep the connections to NOAA and Google alive and skip the TCP and
+# TLS handshakes on all but the first request to each host. The pool needs to be at least as large
+# as the number of threads making requests, or urllib3 throws away the extra connections.
+SESSION = requests.Session()
+
+# Rate limiting and transient server errors are retried with exponential backoff. When the server
+# says how long to wait with a Retry-After header, that wait is used instead.
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True)))
+SESSION.headers['User-Agent'] = 'Pytide'
+
+# Give up on a host that can't be reached quickly, but allow a slower server more time to respond, so
+# one hung request can't stall the whole report.
+TIMEOUT = (10, 30)
@@ -1,63 +1,170 @@
 """
 Functions for retrieving tide predictions and station metadata
 """
-from typing import Any
+import json
+import logging
+from typing import Any, Optional
 
-import requests
+from repositories import cache
+from repositories.session import SESSION, TIMEOUT
 from requests.exceptions import RequestException
 
+# orjson is an optional, much faster drop-in for parsing the large station list. Writing only happens
+# once a day, so the standard library is fine for that.
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
 
-def get_all_station_metadata() -> list[dict[str, Any]]:
+_LOGGER = logging.getLogger(__name__)
+
+# Station names and locations rarely change, so the station list only needs revalidating once a day.
+_METADATA_CACHE_NAME = 'stations.json'
+_METADATA_MAX_AGE = 24 * 60 * 60
+
+# The API used for tide predictions gives us the times and levels of the high / low tides. Only the
+# station changes between requests, so the rest of the query is built once.
+#   https://api.tidesandcurrents.noaa.gov/api/prod/
+_PREDICTIONS_URL = 'https://api.tidesandcurrents.noaa.gov/api/prod/datagetter'
+_PREDICTIONS_PARAMETERS = {
+    'date': 'today',
+    'product': 'predictions',
+    'datum': 'MLLW',
+    'units': 'english',
+    'time_zone': 'lst_ldt',
+    'format': 'json',
+    'interval': 'hilo',
+    'application': 'Pytide: https://github.com/pfeif/pytide'
+}
+
+
+def get_all_station_metadata() -> dict[str, dict[str, Any]]:
     """
-    Get metadata for all tide prediction stations.
+    Get metadata for all tide prediction stations, using the on-disk cache when it is fresh.
 
-    :returns: A JSON array of stations with metadata
-    :rtype: list[dict[str, Any]]
+    :returns: A mapping of station IDs to station metadata
+    :rtype: dict[str, dict[str, Any]]
     """
     # The API used here is specifically for gathering metadata about the NOAA stations. It provides
     # us with things like the name, latitude and longitude of each station.
     #   https://api.tidesandcurrents.noaa.gov/mdapi/prod/.
     api_url = 'https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi/stations.json?type=tidepredictions'
 
+    cached_metadata = cache.read(_METADATA_CACHE_NAME, _METADATA_MAX_AGE)
+    cached_stations = __load_stations(cached_metadata)
+
+    if cached_stations is not None:
+        return cached_stations
+
     try:
-        response = requests.get(api_url, timeout=10)
+        # If an older copy is cached, NOAA can answer with 304 Not Modified instead of the full
+        # list. A fresh copy that couldn't be loaded is damaged, so replace it instead of
+        # revalidating it.
+        headers = {} if cached_metadata else cache.get_conditional_headers(_METADATA_CACHE_NAME)
+        response = SESSION.get(api_url, headers=headers, timeout=TIMEOUT)
         response.raise_for_status()
 
-        return response.json()['stations']
-    except RequestException as error:
-        raise SystemExit(f'Unable to retrieve station metadata -> {error}') from error
+        if response.status_code == 304:
+            cached_stations = __load_stations(cache.read(_METADATA_CACHE_NAME))
+
+            if cached_stations is not None:
+                cache.touch(_METADATA_CACHE_NAME)
+
+                return cached_stations
+
+            # The cached copy turned out to be damaged or missing, so ask for the full list after all.
+            response = SESSION.get(api_url, timeout=TIMEOUT)
+            response.raise_for_status()
+
+        # Only a few fields of each station are used, so cache a trimmed copy of the list. It is a
+        # fraction of the size of NOAA's response and much faster to load on later runs.
+        stations = [__trim_station(station) for station in loads(response.content)['stations']]
+        cache.write(_METADATA_CACHE_NAME, json.dumps({'stations': stations}).encode(), response.headers)
 
+        return __index_stations(stations)
+    except (RequestException, KeyError, TypeError, ValueError) as error:
+        # The station list rarely changes, so an out-of-date copy is much better than no report.
+        stale_stations = __load_stations(cache.read(_METADATA_CACHE_NAME))
 
-def get_predictions_for_station(station_id: str) -> Any:
+        if stale_stations is None:
+            raise SystemExit(f'Unable to retrieve station metadata -> {error}') from error
+
+        _LOGGER.warning('Unable to refresh station metadata, so using the cached copy -> %s', error)
+
+        return stale_stations
+
+
+def get_predictions_for_station(station_id: str) -> Optional[Any]:
     """
     Query NOAA and return tide predictions for the station.
 
     :param str station_id: The station to retrieve predictions for
 
-    :returns: A JSON object with a key of `predictions` and an array of predictions
-    :rtype: Any
-    """
-    # The API used here is for gathering tide predictions for the NOAA station. It'll give us
-    # the times and levels of the high / low tides.
-    #   https://api.tidesandcurrents.noaa.gov/api/prod/
-    api_url = 'https://api.tidesandcurrents.noaa.gov/api/prod/datagetter'
-
-    parameters = {
-        'station': station_id,
-        'date': 'today',
-        'product': 'predictions',
-        'datum': 'MLLW',
-        'units': 'english',
-        'time_zone': 'lst_ldt',
-        'format': 'json',
-        'interval': 'hilo',
-        'application': 'Pytide: https://github.com/pfeif/pytide'
-    }
+    :returns: A JSON object with a key of `predictions` and an array of predictions, or None if the
+        predictions couldn't be retrieved
+    :rtype: Optional[Any]
+    """
+    parameters = {'station': station_id, **_PREDICTIONS_PARAMETERS}
 
+    # One station's missing predictions shouldn't cost everyone else their report, so report the
+    # problem and carry on.
     try:
-        response = requests.get(api_url, params=parameters, timeout=10)
+        response = SESSION.get(_PREDICTIONS_URL, params=parameters, timeout=TIMEOUT)
         response.raise_for_status()
 
-        return response.json()
-    except RequestException as error:
-        raise SystemExit(f'Unable to retrieve tide predictions -> {error}') from error
+        predictionary = loads(response.content)
+    except (RequestException, ValueError) as error:
+        _LOGGER.warning('Unable to retrieve tide predictions for station %s -> %s', station_id, error)
+
+        return None
+
+    # NOAA reports problems like unavailable data as an error object in a successful response.
+    if 'predictions' not in predictionary:
+        _LOGGER.warning('Unable to retrieve tide predictions for station %s -> %s', station_id,
+                        predictionary.get('error'))
+
+        return None
+
+    return predictionary
+
+
+def __load_stations(data: Optional[bytes]) -> Optional[dict[str, dict[str, Any]]]:
+    """
+    Return the stations in a cached station list keyed by station ID.
+
+    :param Optional[bytes] data: The cached station list, if there is one
+
+    :returns: A mapping of station IDs to station metadata, or None if data is missing or damaged
+    :rtype: Optional[dict[str, dict[str, Any]]]
+    """
+    if not data:
+        return None
+
+    try:
+        return __index_stations(loads(data)['stations'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def __index_stations(stations: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """
+    Return the stations keyed by station ID.
+
+    :param list[dict[str, Any]] stations: The JSON array of stations with metadata
+
+    :returns: A mapping of station IDs to station metadata
+    :rtype: dict[str, dict[str, Any]]
+    """
+    return {station['id']: station for station in stations}
+
+
+def __trim_station(station: dict[str, Any]) -> dict[str, Any]:
+    """
+    Return only the station metadata Pytide uses.
+
+    :param dict[str, Any] station: The full NOAA metadata for a station
+
+    :returns: The station's ID, name, latitude, and longitude
+    :rtype: dict[str, Any]
+    """
+    return {key: station[key] for key in ('id', 'name', 'lat', 'lng')}
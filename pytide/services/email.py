@@ -1,21 +1,33 @@
 """
 Functions for creating and sending emails
 """
+import functools
+import logging
 import os
+from email.generator import BytesGenerator
 from email.message import EmailMessage
-from email.utils import make_msgid
-from smtplib import SMTP
+from typing import Optional
 
-from jinja2 import Environment, FileSystemLoader
-from models.image import Image
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from models.image import Image, make_content_id
+from models.smtp_settings import SmtpSettings
 from models.station import Station
+from repositories import cache
 
+_LOGGER = logging.getLogger(__name__)
 
-def create_message(source_dir: str, stations: list[Station], save_html: bool, save_email: bool) -> EmailMessage:
+# Everything Pytide reads or writes here is found relative to the source code directory.
+_SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEMPLATES_DIR = os.path.join(_SOURCE_DIR, 'templates')
+_LOGO_PATH = os.path.join(_SOURCE_DIR, 'assets', 'img', 'logo-192.png')
+_HTML_OUTPUT_PATH = os.path.join(_SOURCE_DIR, '..', 'message.html')
+_EMAIL_OUTPUT_PATH = os.path.join(_SOURCE_DIR, '..', 'message.eml')
+
+
+def create_message(stations: list[Station], save_html: bool, save_email: bool) -> EmailMessage:
     """
     Return one EmailMessage containing data from each station in stations.
 
-    :param str source_dir: The root of the source code directory
     :param list[Station] stations: The list of stations used to populate the email
     :param bool save_html: Whether to save the email body HTML locally
     :param bool save_email: Whether to save the email message locally
@@ -23,65 +35,73 @@ def create_message(source_dir: str, stations: list[Station], save_html: bool, sa
     :returns: The email message without sender or recipient information
     :rtype: EmailMessage
     """
-    logo_path = os.path.join(source_dir, 'assets', 'img', 'logo-192.png')
-
-    with open(logo_path, 'rb') as file:
-        logo_image = file.read()
-
-    logo = Image(logo_image, make_msgid('pytide-logo'))
+    logo = Image(__read_logo(), make_content_id('pytide-logo'))
 
     plain_text_body = '\n\n'.join(str(station) for station in stations)
 
     html_body: str = __render_template(
-        os.path.join(source_dir, 'templates'),
+        _TEMPLATES_DIR,
         'bootstrap-email-template.html',
         stations,
         logo.content_id)
 
     if save_html:
-        output_path = os.path.join(source_dir, '..', 'message.html')
-
-        with open(output_path, mode='wt', encoding='utf-8') as file:
-            file.writelines(html_body)
+        with open(_HTML_OUTPUT_PATH, mode='wt', encoding='utf-8') as file:
+            file.write(html_body)
 
     attachments = [logo]
+    attached_ids = {logo.content_id}
 
+    # A station whose map couldn't be retrieved is still reported, just without its map. Stations
+    # that share coordinates share one map image, which only needs to be attached once.
     for station in stations:
-        attachments.append(station.image)
+        if station.image.image and station.image.content_id not in attached_ids:
+            attachments.append(station.image)
+            attached_ids.add(station.image.content_id)
 
     message = __compose_message('Your customized Pytide report', plain_text_body, html_body, attachments)
 
     if save_email:
-        output_path = os.path.join(source_dir, '..', 'message.eml')
-
-        with open(output_path, mode='wt', encoding='utf-8') as file:
-            file.writelines(message.as_string())
+        # Flatten the message straight into the file rather than building the whole message, images
+        # and all, as one string first.
+        with open(_EMAIL_OUTPUT_PATH, mode='wb') as file:
+            BytesGenerator(file).flatten(message)
 
     return message
 
 
-def send_message(message: EmailMessage, recipients: set[str], smtp_settings: dict[str, str]) -> None:
+def send_message(message: EmailMessage, recipients: set[str], smtp_settings: SmtpSettings) -> None:
     """
-    Send message to each recipient in recipients using smtp_settings.
+    Send message to every recipient in recipients in a single SMTP transaction using smtp_settings.
 
     :param EmailMessage message: The message to send
     :param set[str] recipients: The message recipients
-    :param dict[str, str] smtp_settings: The user's email server settings
+    :param SmtpSettings smtp_settings: The user's email server settings
     """
-    message['From'] = smtp_settings['sender']
+    # An empty recipient list would only make the server refuse the message after logging in.
+    if not recipients:
+        _LOGGER.warning('No recipients are configured, so the report was not sent')
+
+        return
 
-    with SMTP(smtp_settings['host'], int(smtp_settings['port'])) as connection:
-        # Enter TLS mode. Everything from here, on is encrypted.
-        connection.starttls()
-        connection.login(smtp_settings['user'], smtp_settings['password'])
+    # smtplib and ssl are only needed when actually sending, so keep them off the startup path for
+    # runs that only save the message locally.
+    import ssl  # pylint: disable=import-outside-toplevel
+    from smtplib import SMTP  # pylint: disable=import-outside-toplevel
 
-        for address in recipients:
-            if not message['To']:
-                message['To'] = address
-            else:
-                message.replace_header('To', address)
+    message['From'] = smtp_settings.sender
 
-            connection.send_message(message)
+    # Address the message to the sender and deliver it to the recipients as blind copies. The body is
+    # uploaded to the server once, and recipients still can't see who else received the report.
+    message['To'] = smtp_settings.sender
+
+    with SMTP(smtp_settings.host, smtp_settings.port) as connection:
+        # Enter TLS mode. Everything from here, on is encrypted. Without a context, starttls neither
+        # loads the system's trusted certificates nor checks the server's certificate.
+        connection.starttls(context=ssl.create_default_context())
+        connection.login(smtp_settings.user, smtp_settings.password)
+
+        connection.send_message(message, to_addrs=list(recipients))
 
 
 def __render_template(templates_path: str, template_name: str, stations: list[Station], logo_cid: str) -> str:
@@ -96,17 +116,51 @@ def __render_template(templates_path: str, template_name: str, stations: list[St
     :returns: The rendered HTML template
     :rtype: str
     """
-    jinja_env = Environment(
-        loader=FileSystemLoader(templates_path),  # sets the templates directory
-        autoescape=True)  # prevents cross-site scripting
-
-    email_template = jinja_env.get_template(template_name)
+    email_template = __get_environment(templates_path).get_template(template_name)
 
     html_body = email_template.render(tide_stations=stations, logo_cid=logo_cid)
 
     return html_body
 
 
+@functools.cache
+def __read_logo() -> bytes:
+    """
+    Return the bytes of the Pytide logo, reading the file only once.
+
+    :returns: The PNG logo
+    :rtype: bytes
+    """
+    with open(_LOGO_PATH, 'rb') as file:
+        return file.read()
+
+
+@functools.cache
+def __get_environment(templates_path: str) -> Environment:
+    """
+    Return the Jinja environment for templates_path, creating it only once.
+
+    :param str templates_path: The directory containing the templates
+
+    :returns: The Jinja environment
+    :rtype: Environment
+    """
+    # Compiled templates are kept on disk so later runs can skip parsing and compiling them. Jinja
+    # checks the template source before reusing the bytecode, so edited templates are recompiled.
+    bytecode_dir: Optional[str] = os.path.join(cache.get_cache_dir(), 'jinja')
+
+    try:
+        os.makedirs(bytecode_dir, exist_ok=True)
+    except OSError:
+        bytecode_dir = None
+
+    return Environment(
+        loader=FileSystemLoader(templates_path),  # sets the templates directory
+        autoescape=True,  # prevents cross-site scripting
+        auto_reload=False,  # templates don't change while Pytide runs
+        bytecode_cache=FileSystemBytecodeCache(bytecode_dir) if bytecode_dir else None)
+
+
 def __compose_message(subject: str, plain_text: str, html_body: str, image_attachments: list[Image]) -> EmailMessage:
     """
     Return one EmailMessage containing data from each station in stations.
@@ -0,0 +1,94 @@
+"""
+Tests for the command line application
+"""
+import os
+import sys
+import tempfile
+import unittest
+from typing import Optional
+from unittest import mock
+
+from click.testing import CliRunner, Result
+
+# Pytide runs as a script from its source directory, so import its modules the same way.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pytide'))
+
+import pytide  # pylint: disable=wrong-import-position
+
+
+class TestSmtpSettings(unittest.TestCase):
+    """The email server settings are validated before anything is sent"""
+
+    def setUp(self) -> None:
+        temporary_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary_dir.cleanup)
+        self.config_path = os.path.join(temporary_dir.name, 'config.ini')
+
+        self.send_message = mock.Mock()
+
+        patches = [
+            mock.patch('services.email.create_message'),
+            mock.patch('services.email.send_message', self.send_message),
+        ]
+
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_pytide(self, port_line: Optional[str], *args: str) -> Result:
+        """Run Pytide without stations, using a configuration file with the given port line."""
+        smtp_lines = ['sender: sender@example.com', 'host: smtp.example.com', 'user: sender@example.com',
+                      'password: secret_password']
+
+        if port_line is not None:
+            smtp_lines.append(port_line)
+
+        with open(self.config_path, mode='wt', encoding='utf-8') as file:
+            file.write('\n'.join(['[STATIONS]', '[RECIPIENTS]', 'recipient@example.com', '[SMTP SERVER]',
+                                  *smtp_lines, '[GOOGLE MAPS API]', 'key: secret_key']))
+
+        return CliRunner().invoke(pytide.main, ['--config-file', self.config_path, *args])
+
+    def test_valid_port(self) -> None:
+        """A valid port is parsed and used to send the report."""
+        result = self.run_pytide('port: 587')
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(self.send_message.call_args.args[2].port, 587)
+
+    def test_missing_port(self) -> None:
+        """A missing port ends the run before anything is sent."""
+        result = self.run_pytide(None)
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Missing SMTP SERVER setting', result.output)
+        self.send_message.assert_not_called()
+
+    def test_port_without_value(self) -> None:
+        """A port line without a value ends the run before anything is sent."""
+        for port_line in ('port', 'port:'):
+            with self.subTest(port_line=port_line):
+                result = self.run_pytide(port_line)
+
+                self.assertEqual(result.exit_code, 1)
+                self.assertIn('Missing SMTP SERVER setting', result.output)
+                self.send_message.assert_not_called()
+
+    def test_invalid_port(self) -> None:
+        """A port that isn't a number ends the run before anything is sent."""
+        result = self.run_pytide('port: smtp')
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Invalid SMTP SERVER port', result.output)
+        self.send_message.assert_not_called()
+
+    def test_invalid_port_without_sending(self) -> None:
+        """The email server settings aren't needed when the report isn't sent."""
+        result = self.run_pytide('port: smtp', '--no-send')
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.send_message.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for station data retrieval
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# Pytide runs as a script from its source directory, so import its modules the same way.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pytide'))
+
+from models.station import Station  # pylint: disable=wrong-import-position
+from services import email  # pylint: disable=wrong-import-position
+
+
+class TestSharedMaps(unittest.TestCase):
+    """Stations that share coordinates share one map"""
+
+    def setUp(self) -> None:
+        # Keep the compiled template cache out of the user's real cache directory.
+        cache_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(cache_dir.cleanup)
+
+        # The Jinja environment is created once per process, and its bytecode cache points into the
+        # cache directory, so rebuild it for this test and don't leave it behind for others.
+        get_environment = getattr(email, '__get_environment')
+        get_environment.cache_clear()
+        self.addCleanup(get_environment.cache_clear)
+
+        metadata = {
+            station_id: {'id': station_id, 'name': f'Station {station_id}', 'lat': 47.6026, 'lng': -122.3393}
+            for station_id in ('1', '2', '3', '4')
+        }
+        predictions = {'predictions': [{'t': '2024-01-01 01:00', 'type': 'H', 'v': '1.234'}]}
+
+        # Hold every map request open until all stations have asked for one, so the requests are
+        # guaranteed to overlap.
+        self.barrier = threading.Barrier(4, timeout=0.5)
+        self.map_calls = 0
+
+        patches = [
+            mock.patch.dict(os.environ, {'XDG_CACHE_HOME': cache_dir.name}),
+            mock.patch.object(Station, '_metadata', metadata),
+            mock.patch.object(Station, '_maps', {}),
+            mock.patch.object(Station, 'api_key', 'key', create=True),
+            mock.patch('repositories.tides.get_predictions_for_station', return_value=predictions),
+            mock.patch('repositories.maps.get_map_image', side_effect=self.get_map_image),
+        ]
+
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def get_map_image(self, latitude: str, longitude: str, api_key: str) -> bytes:
+        """Stand in for the Maps Static API, waiting briefly for other map requests."""
+        self.map_calls += 1
+
+        try:
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+
+        return f'{latitude},{longitude},{api_key}'.encode()
+
+    def test_concurrent_stations_share_one_map(self) -> None:
+        """Stations fetched concurrently retrieve and attach a shared map only once."""
+        stations = [Station(station_id) for station_id in ('1', '2', '3', '4')]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(Station.fetch, stations))
+
+        self.assertEqual(self.map_calls, 1)
+        self.assertEqual(len({station.image.content_id for station in stations}), 1)
+
+        message = email.create_message(stations, save_html=False, save_email=False)
+        map_attachments = [part for part in message.iter_attachments()
+                           if part['Content-ID'] == stations[0].image.content_id]
+
+        self.assertEqual(len(map_attachments), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()